@@ -1,36 +1,50 @@
 import os
 import logging
+from datetime import datetime
 from flask import Flask, request
-from telegram import Bot, Update
-from telegram.ext import Dispatcher, CommandHandler
+from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import Dispatcher, CommandHandler, CallbackQueryHandler
 from dotenv import load_dotenv
+from tracing import span, traced, profiled, arm_profile, recent_traces, format_trace
 from utils import (
     generate_trade_signal,
     store_trade,
     evaluate_open_trades,
-    get_last_trades,
+    get_trades_page,
     get_results_summary,
     run_backtest,
     get_status,
-    get_logs,
+    iter_export_parts,
+    EXPORT_FORMATS,
     fetch_combined_liquidation,
     fetch_news,
+    start_news_poller,
     compute_rsi,
     calculate_score,
     fetch_mexc_ohlcv,
     fetch_mexc_ticker,
+    get_recent_candles,
+    candle_cache_state,
+    restore_candle_cache,
+    closed_candles,
 )
+from snapshot import save_snapshot, load_snapshot
+from config import SNAPSHOT_MAX_AGE
+from scheduler import run_scheduler, run_manual_scan, restore_last_tick, scheduler_stats
 
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")
 OWNER_CHAT_ID = os.getenv("OWNER_CHAT_ID")
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org/bot")
+SNAPSHOT_FILE = os.getenv("SNAPSHOT_FILE", "bot_state.json")
+SCAN_LOCK_TIMEOUT = 30
 
 if not TELEGRAM_TOKEN or not WEBHOOK_URL:
     raise RuntimeError("Missing required env vars TELEGRAM_BOT_TOKEN or WEBHOOK_URL.")
 
-bot = Bot(token=TELEGRAM_TOKEN)
+bot = Bot(token=TELEGRAM_TOKEN, base_url=TELEGRAM_API_BASE)
 app = Flask(__name__)
 dispatcher = Dispatcher(bot, None, use_context=True)
 
@@ -38,11 +52,21 @@ os.environ["TZ"] = "Asia/Kolkata"
 logging.basicConfig(format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
 
 # --- Handlers ---
+def reply(update: Update, text, **kwargs):
+    with span("telegram.reply"):
+        return update.message.reply_text(text, **kwargs)
+
+def is_owner(update: Update):
+    return bool(OWNER_CHAT_ID) and str(update.effective_chat.id) == str(OWNER_CHAT_ID)
+
+@traced()
 def start(update: Update, context):
-    update.message.reply_text("🚀 LiquidBot live. Use /menu for commands.")
+    reply(update, "🚀 LiquidBot live. Use /menu for commands.")
 
+@traced()
 def menu(update: Update, context):
-    update.message.reply_text(
+    reply(
+        update,
         "/menu\n"
         "/start\n"
         "/backtest\n"
@@ -50,46 +74,115 @@ def menu(update: Update, context):
         "/results\n"
         "/status\n"
         "/logs\n"
+        "/export [csv|json]\n"
         "/liqcheck\n"
         "/news\n"
         "/scan\n"
         "/envcheck\n"
-        "/debug_sources"
+        "/debug_sources\n"
+        "/schedule\n"
+        "/traces [n]\n"
+        "/profile [n]"
     )
 
+@traced()
 def backtest_cmd(update: Update, context):
-    update.message.reply_text(run_backtest())
+    reply(update, run_backtest())
+
+# Page sizes for the paginated trade views; callback data is "<view>:<older|newer>:<id>".
+PAGE_SIZES = {"last30": 30, "logs": 20}
 
+def trades_page(view, direction=None, cursor=None):
+    limit = PAGE_SIZES[view]
+    if direction == "older":
+        text, older, newer = get_trades_page(limit, before_id=cursor)
+    elif direction == "newer":
+        text, older, newer = get_trades_page(limit, after_id=cursor)
+    else:
+        text, older, newer = get_trades_page(limit)
+    buttons = []
+    if newer is not None:
+        buttons.append(InlineKeyboardButton("« Newer", callback_data=f"{view}:newer:{newer}"))
+    if older is not None:
+        buttons.append(InlineKeyboardButton("Older »", callback_data=f"{view}:older:{older}"))
+    return text, (InlineKeyboardMarkup([buttons]) if buttons else None)
+
+@traced()
 def last30_cmd(update: Update, context):
-    update.message.reply_text(get_last_trades())
+    text, markup = trades_page("last30")
+    reply(update, text, reply_markup=markup)
 
+@traced()
 def results_cmd(update: Update, context):
-    update.message.reply_text(get_results_summary())
+    reply(update, get_results_summary())
 
+@traced()
 def status_cmd(update: Update, context):
-    update.message.reply_text(get_status())
+    reply(update, get_status())
 
+@traced()
 def logs_cmd(update: Update, context):
-    update.message.reply_text(get_logs())
+    text, markup = trades_page("logs")
+    reply(update, text, reply_markup=markup)
+
+@traced()
+def trades_page_cb(update: Update, context):
+    query = update.callback_query
+    view, direction, cursor = query.data.split(":")
+    text, markup = trades_page(view, direction, int(cursor))
+    with span("telegram.edit_message"):
+        query.answer()
+        query.edit_message_text(text, reply_markup=markup)
 
+@traced()
+def export_cmd(update: Update, context):
+    fmt = (context.args[0].lower() if context.args else "csv")
+    if fmt not in EXPORT_FORMATS:
+        reply(update, "Usage: /export [csv|json]")
+        return
+    # python-telegram-bot reads each upload fully into memory, so the export is
+    # sent as size-capped gzip parts rather than one file.
+    parts = 0
+    for fh, size in iter_export_parts(fmt):
+        parts += 1
+        with span("telegram.reply_document"):
+            update.message.reply_document(
+                document=fh,
+                filename=f"trades.{fmt}.part{parts:03d}.gz",
+                caption=f"Trade history export, part {parts} ({size:,} bytes uncompressed)",
+            )
+    reply(update, f"Export complete: {parts} part(s). Rebuild with: cat trades.{fmt}.part*.gz | gunzip > trades.{fmt}")
+
+@traced()
 def liqcheck(update: Update, context):
     liq, source = fetch_combined_liquidation()
-    update.message.reply_text(f"Liquidation proxy: ${liq:,.0f} (source: {source})")
+    reply(update, f"Liquidation proxy: ${liq:,.0f} (source: {source})")
 
+@traced()
 def news_cmd(update: Update, context):
     headlines = fetch_news()
-    update.message.reply_text("\n\n".join(headlines))
+    reply(update, "\n\n".join(headlines))
 
+@traced()
 def envcheck(update: Update, context):
     missing = []
     for name in ["TELEGRAM_BOT_TOKEN", "WEBHOOK_URL", "OWNER_CHAT_ID", "COINGLASS_API_KEY", "NEWS_API_KEY"]:
         if not os.getenv(name):
             missing.append(name)
     if missing:
-        update.message.reply_text("Missing env vars: " + ", ".join(missing))
+        reply(update, "Missing env vars: " + ", ".join(missing))
+    else:
+        reply(update, "All expected env vars are set.")
+
+# Plain owner alert, used by logic.monitor_and_trade.
+def send_alert(text):
+    if OWNER_CHAT_ID:
+        with span("telegram.send_message"):
+            bot.send_message(chat_id=OWNER_CHAT_ID, text=text, parse_mode="Markdown")
     else:
-        update.message.reply_text("All expected env vars are set.")
+        logging.warning("OWNER_CHAT_ID not set; cannot send alert.")
 
+@traced()
 def send_signal_message(signal):
     direction = signal["direction"].upper()
     score = signal["score"]
@@ -100,28 +193,40 @@ def send_signal_message(signal):
     source = signal.get("liquidation_source", "unknown")
     tp = signal.get("tp_pct", 0.015) * 100
     sl = signal.get("sl_pct", 0.01) * 100
+    news_count = signal.get("news_count_1h", 0)
     strength = "Strong" if score >= 1.5 else ("Moderate" if score >= 1.0 else "Weak")
     msg = (
         f"🚨 {direction} Signal\n"
         f"Entry: {entry:.1f}\n"
         f"RSI: {rsi} | Wick%: {wick:.2f}% | Liq: ${liq:,.0f} ({source})\n"
         f"Score: {score} → {strength} setup\n"
+        f"News (1h): {news_count} headlines\n"
         f"TP: +{tp:.2f}% | SL: -{sl:.2f}%"
     )
     if OWNER_CHAT_ID:
-        bot.send_message(chat_id=OWNER_CHAT_ID, text=msg)
+        with span("telegram.send_message"):
+            bot.send_message(chat_id=OWNER_CHAT_ID, text=msg)
     else:
         logging.warning("OWNER_CHAT_ID not set; cannot send signal.")
 
+@traced()
 def scan_cmd(update: Update, context):
+    # Shares the scheduler's lock so a manual scan never races a scheduled one.
+    if not run_manual_scan(lambda: run_scan(update), SCAN_LOCK_TIMEOUT):
+        reply(update, "⏳ A scan is already running; try again shortly.")
+
+# Profiled here, under the lock, so a /scan that times out waiting is not
+# counted as one of the profiled runs.
+@profiled
+def run_scan(update: Update):
     try:
         evaluate_open_trades()
     except Exception as e:
-        update.message.reply_text(f"Error evaluating open trades: {e}")
+        reply(update, f"Error evaluating open trades: {e}")
 
-    ohlcv = fetch_mexc_ohlcv()
+    ohlcv = closed_candles(get_recent_candles())
     if not ohlcv:
-        update.message.reply_text("🔍 Scan: failed to fetch MEXC OHLCV.")
+        reply(update, "🔍 Scan: failed to fetch MEXC OHLCV.")
         return
 
     closes = [c["close"] for c in ohlcv]
@@ -147,19 +252,23 @@ def scan_cmd(update: Update, context):
         f"Liquidation proxy: ${liq:,.0f} (source: {source})\n"
         f"Score Long: {score_long} | Score Short: {score_short}"
     )
-    update.message.reply_text(debug_msg)
+    reply(update, debug_msg)
 
     signal = generate_trade_signal()
     if signal:
         try:
-            store_trade(signal)
+            if not store_trade(signal):
+                reply(update, "🔍 Scan: signal for this candle was already sent.")
+                return
         except Exception as e:
-            update.message.reply_text(f"Failed to store signal: {e}")
+            reply(update, f"Failed to store signal: {e}")
+            return
         send_signal_message(signal)
-        update.message.reply_text("🔍 Scan: real signal processed.")
+        reply(update, "🔍 Scan: real signal processed.")
     else:
-        update.message.reply_text("🔍 Scan: no high-confidence real signal.")
+        reply(update, "🔍 Scan: no high-confidence real signal.")
 
+@traced()
 def debug_sources(update: Update, context):
     ohlcv = fetch_mexc_ohlcv()
     close = ohlcv[-1]["close"] if ohlcv else "none"
@@ -167,13 +276,54 @@ def debug_sources(update: Update, context):
     mexc_ticker = fetch_mexc_ticker()
     hold_vol = mexc_ticker.get("holdVol", "n/a")
     funding = mexc_ticker.get("fundingRate", "n/a")
-    update.message.reply_text(
+    reply(
+        update,
         f"MEXC last close: {close}\n"
         f"Liquidation proxy: ${liq:,.0f} (source: {source})\n"
         f"MEXC holdVol: {hold_vol}\n"
         f"MEXC fundingRate: {funding}"
     )
 
+@traced()
+def schedule_cmd(update: Update, context):
+    st = scheduler_stats()
+    last_tick = datetime.fromtimestamp(st["last_tick"]).strftime("%Y-%m-%d %H:%M:%S") if st["last_tick"] else "never"
+    reply(
+        update,
+        f"⏱️ Scheduler (every {st['interval']}s, +{st['settle']}s after close)\n"
+        f"Last tick: {last_tick}\n"
+        f"Runs: {st['runs']} | Missed ticks: {st['missed']} | Skipped (locked): {st['skipped']}\n"
+        f"Manual /scan timeouts: {st['manual_timeouts']}\n"
+        f"Lag: last {st['last_lag']}s, max {st['max_lag']}s\n"
+        f"Last run took: {st['last_duration']}s"
+    )
+
+@traced()
+def traces_cmd(update: Update, context):
+    if not is_owner(update):
+        reply(update, "Owner only.")
+        return
+    limit = int(context.args[0]) if context.args and context.args[0].isdigit() else 5
+    traces = recent_traces(min(limit, 20))
+    if not traces:
+        reply(update, "No traces recorded yet.")
+        return
+    text = "\n\n".join("\n".join(format_trace(t)) for t in traces)
+    reply(update, text[-4000:])
+
+def send_profile_report(report):
+    bot.send_message(chat_id=OWNER_CHAT_ID, text=report[:4000])
+
+@traced()
+def profile_cmd(update: Update, context):
+    if not is_owner(update):
+        reply(update, "Owner only.")
+        return
+    runs = int(context.args[0]) if context.args and context.args[0].isdigit() else 3
+    runs = max(1, min(runs, 20))
+    arm_profile(runs, send_profile_report)
+    reply(update, f"🔬 Profiling the next {runs} scan(s); report will follow.")
+
 # Register handlers
 dispatcher.add_handler(CommandHandler("start", start))
 dispatcher.add_handler(CommandHandler("menu", menu))
@@ -182,11 +332,16 @@ dispatcher.add_handler(CommandHandler("last30", last30_cmd))
 dispatcher.add_handler(CommandHandler("results", results_cmd))
 dispatcher.add_handler(CommandHandler("status", status_cmd))
 dispatcher.add_handler(CommandHandler("logs", logs_cmd))
+dispatcher.add_handler(CallbackQueryHandler(trades_page_cb, pattern=r"^(last30|logs):(older|newer):\d+$"))
+dispatcher.add_handler(CommandHandler("export", export_cmd))
 dispatcher.add_handler(CommandHandler("liqcheck", liqcheck))
 dispatcher.add_handler(CommandHandler("news", news_cmd))
 dispatcher.add_handler(CommandHandler("scan", scan_cmd))
 dispatcher.add_handler(CommandHandler("envcheck", envcheck))
 dispatcher.add_handler(CommandHandler("debug_sources", debug_sources))
+dispatcher.add_handler(CommandHandler("schedule", schedule_cmd))
+dispatcher.add_handler(CommandHandler("traces", traces_cmd))
+dispatcher.add_handler(CommandHandler("profile", profile_cmd))
 
 # Webhook
 @app.route(f"/{TELEGRAM_TOKEN}", methods=["POST"])
@@ -199,13 +354,24 @@ def webhook():
 def index():
     return "Bot is running."
 
+# Warm-restart snapshot: candle cache plus the scheduler's last tick.
+def save_runtime_snapshot():
+    save_snapshot(SNAPSHOT_FILE, {"candles": candle_cache_state(), "last_tick": scheduler_stats()["last_tick"]})
+
+def restore_runtime_snapshot():
+    state = load_snapshot(SNAPSHOT_FILE, SNAPSHOT_MAX_AGE)
+    if state:
+        restore_candle_cache(state.get("candles"))
+        restore_last_tick(state.get("last_tick"))
+
 # Scheduled loop
+@traced()
+@profiled
 def scheduled_tasks():
     try:
         evaluate_open_trades()
         signal = generate_trade_signal()
-        if signal:
-            store_trade(signal)
+        if signal and store_trade(signal):
             send_signal_message(signal)
     except Exception as e:
         logging.error("Scheduled task failed: %s", e)
@@ -214,12 +380,8 @@ if __name__ == "__main__":
     logging.info("Starting bot with webhook URL: %s", f"{WEBHOOK_URL}/{TELEGRAM_TOKEN}")
     bot.set_webhook(url=f"{WEBHOOK_URL}/{TELEGRAM_TOKEN}")
     from threading import Thread
-    import time
-
-    def loop():
-        while True:
-            scheduled_tasks()
-            time.sleep(300)
 
-    Thread(target=loop, daemon=True).start()
+    restore_runtime_snapshot()
+    start_news_poller()
+    Thread(target=run_scheduler, args=(scheduled_tasks,), kwargs={"on_tick": save_runtime_snapshot}, daemon=True).start()
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
@@ -11,3 +11,6 @@ THRESHOLD_LIQUIDATION_USD = 10000000
 PRICE_DROP_PCT = 2.5
 REBOUND_PCT = 0.75
 TIME_WINDOW_SECONDS = 900
+
+MONITOR_STATE_FILE = os.getenv("MONITOR_STATE_FILE", "monitor_state.json")
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", "900"))
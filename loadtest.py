@@ -0,0 +1,444 @@
+# --- Load-test harness ---
+# Replays recorded or synthetic liquidation-cascade candles through the bot.
+# One in-process HTTP server stands in for MEXC, CoinGlass and the Telegram Bot
+# API (wired up via MEXC_BASE, COINGLASS_BASE and TELEGRAM_API_BASE), and a
+# virtual clock replaces `time` in utils and scheduler so the real candle-close
+# scheduler runs at --speed x real time while command bursts hit the Flask
+# webhook. --data takes a JSON list of {"open_time": ms, "open", "high", "low",
+# "close", "liquidation_usd"}; without it a synthetic cascade is generated.
+#
+#   python loadtest.py --speed 100
+#   python loadtest.py --speed 1000 --data cascade.json --json report.json
+import os
+import sys
+import json
+import time
+import re
+import random
+import sqlite3
+import logging
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+CANDLE_SECONDS = 300
+HISTORY_CANDLES = 50
+TOKEN = "123456:LOADTEST"
+OWNER_CHAT_ID = 4242
+ENTRY_RE = re.compile(r"Entry: ([0-9.]+)")
+COMMANDS = ["/scan", "/last30", "/logs", "/status", "/results", "/news", "/liqcheck", "/backtest"]
+
+# --- Virtual clock ---
+class VirtualClock:
+    def __init__(self, start, speed):
+        self.start = start
+        self.speed = speed
+        self.real_start = time.perf_counter()
+
+    def time(self):
+        return self.start + (time.perf_counter() - self.real_start) * self.speed
+
+    def sleep(self, seconds):
+        time.sleep(max(seconds, 0) / self.speed)
+
+    def monotonic(self):
+        return self.time()
+
+    def perf_counter(self):
+        return time.perf_counter()
+
+# --- Cascade data ---
+def synthetic_cascade(candles=288, cascade_at=150, cascade_len=12, seed=7):
+    rng = random.Random(seed)
+    start = (int(time.time()) // CANDLE_SECONDS - candles - 1) * CANDLE_SECONDS
+    price = 60_000.0
+    out = []
+    for i in range(candles):
+        in_cascade = cascade_at <= i < cascade_at + cascade_len
+        drift = -0.012 if in_cascade else (0.006 if cascade_at + cascade_len <= i < cascade_at + 2 * cascade_len else 0.0)
+        open_p = price
+        close_p = open_p * (1 + drift + rng.gauss(0, 0.002))
+        body_low, body_high = min(open_p, close_p), max(open_p, close_p)
+        wick = 0.02 if in_cascade else 0.002
+        low = body_low * (1 - abs(rng.gauss(0, wick)))
+        high = body_high * (1 + abs(rng.gauss(0, 0.002)))
+        liq = rng.uniform(20e6, 150e6) if in_cascade else rng.uniform(0.2e6, 3e6)
+        out.append(
+            {
+                "open_time": (start + i * CANDLE_SECONDS) * 1000,
+                "open": round(open_p, 1),
+                "high": round(high, 1),
+                "low": round(low, 1),
+                "close": round(close_p, 1),
+                "liquidation_usd": round(liq),
+            }
+        )
+        price = close_p
+    return out
+
+# --- Local stand-ins ---
+class Replay:
+    def __init__(self, candles, clock):
+        self.candles = candles
+        self.clock = clock
+        self.lock = threading.Lock()
+        # Only what the report needs is kept, so the harness itself stays small.
+        self.telegram_methods = {}
+        self.signal_msgs = []  # (real_time, entry price text)
+        self.locked_replies = 0
+        self.requests = {"mexc": 0, "coinglass": 0, "telegram": 0}
+
+    def visible(self, start=None, end=None):
+        now_ms = self.clock.time() * 1000
+        rows = [c for c in self.candles if c["open_time"] <= now_ms]
+        if start is not None:
+            rows = [c for c in rows if start * 1000 <= c["open_time"] <= end * 1000]
+        return rows
+
+    def liquidation_now(self):
+        now_ms = self.clock.time() * 1000
+        closed = [c for c in self.candles if c["open_time"] + CANDLE_SECONDS * 1000 <= now_ms]
+        return closed[-1]["liquidation_usd"] if closed else 0
+
+def make_handler(replay):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path.startswith("/api/v1/contract/kline/"):
+                with replay.lock:
+                    replay.requests["mexc"] += 1
+                rows = replay.visible(int(qs.get("start", 0)), int(qs.get("end", 2**40)))
+                self._send(
+                    {
+                        "success": True,
+                        "data": {
+                            "time": [c["open_time"] // 1000 for c in rows],
+                            "open": [c["open"] for c in rows],
+                            "high": [c["high"] for c in rows],
+                            "low": [c["low"] for c in rows],
+                            "close": [c["close"] for c in rows],
+                        },
+                    }
+                )
+            elif url.path.startswith("/api/v1/contract/ticker"):
+                with replay.lock:
+                    replay.requests["mexc"] += 1
+                self._send({"success": True, "data": {"holdVol": 5e8, "fundingRate": 0.0001}})
+            elif url.path.startswith("/api/v1/contract/funding_rate/"):
+                with replay.lock:
+                    replay.requests["mexc"] += 1
+                self._send({"success": True, "data": {"fundingRate": 0.0001}})
+            elif url.path.startswith("/public/v2/liquidation/chart"):
+                with replay.lock:
+                    replay.requests["coinglass"] += 1
+                self._send({"code": "0", "data": [{"sumAmount": replay.liquidation_now()}]})
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length)
+            method = self.path.rsplit("/", 1)[-1]
+            payload = {}
+            if "json" in self.headers.get("Content-Type", ""):
+                payload = json.loads(raw or b"{}")
+            received = time.perf_counter()
+            text = payload.get("text", "")
+            with replay.lock:
+                replay.requests["telegram"] += 1
+                replay.telegram_methods[method] = replay.telegram_methods.get(method, 0) + 1
+                message_id = replay.requests["telegram"]
+                if method == "sendMessage" and text.startswith("🚨"):
+                    entry = ENTRY_RE.search(text)
+                    replay.signal_msgs.append((received, entry.group(1) if entry else None))
+                # /scan catches store/evaluate errors and replies with them instead of logging.
+                if "database is locked" in text:
+                    replay.locked_replies += 1
+            if method in ("answerCallbackQuery", "setWebhook"):
+                self._send({"ok": True, "result": True})
+                return
+            if method == "getMe":
+                self._send({"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "LiquidBot", "username": "liquidbot_load"}})
+                return
+            chat_id = payload.get("chat_id", OWNER_CHAT_ID)
+            self._send(
+                {
+                    "ok": True,
+                    "result": {
+                        "message_id": message_id,
+                        "date": int(time.time()),
+                        "chat": {"id": int(chat_id), "type": "private"},
+                        "text": text,
+                    },
+                }
+            )
+    return Handler
+
+# --- Webhook traffic ---
+_update_ids = iter(range(1, 10**9))
+_update_lock = threading.Lock()
+
+def command_update(text):
+    with _update_lock:
+        update_id = next(_update_ids)
+    command = text.split()[0]
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": OWNER_CHAT_ID, "type": "private"},
+            "from": {"id": OWNER_CHAT_ID, "is_bot": False, "first_name": "load"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        },
+    }
+
+class ErrorCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.locked = 0
+        self.errors = 0
+
+    # Handler exceptions reach the log as python-telegram-bot's generic "No error
+    # handlers are registered" message with the error in exc_info, so check both.
+    def emit(self, record):
+        exc = record.exc_info[1] if record.exc_info else None
+        if "database is locked" in record.getMessage() or (
+            isinstance(exc, sqlite3.OperationalError) and "locked" in str(exc)
+        ):
+            self.locked += 1
+        if record.levelno >= logging.ERROR:
+            self.errors += 1
+
+# --- Report helpers ---
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(int(len(values) * pct / 100), len(values) - 1)], 3)
+
+def collect_spans(traces, prefix):
+    out = []
+    stack = list(traces)
+    while stack:
+        s = stack.pop()
+        if s["name"].startswith(prefix):
+            out.append(s["ms"])
+        stack.extend(s["children"])
+    return out
+
+def expected_signals(candles, first_tick, last_tick, signal_from_candles):
+    expected = set()
+    for i, c in enumerate(candles):
+        close_s = c["open_time"] / 1000 + CANDLE_SECONDS
+        if not first_tick <= close_s <= last_tick:
+            continue
+        window = candles[max(i + 1 - HISTORY_CANDLES, 0): i + 1]
+        if signal_from_candles(window, c["liquidation_usd"], "coinglass"):
+            expected.add(c["open_time"])
+    return expected
+
+# Pair each 🚨 message with its stored row by entry price (the candle close the
+# message prints), so an unmatched message can't shift every later pairing.
+def match_signal_messages(rows, signal_msgs):
+    by_entry = {}
+    for entry_price, candle_open in rows:
+        by_entry.setdefault(f"{entry_price:.1f}", []).append(candle_open)
+    first_msg = {}
+    duplicates = unmatched = 0
+    for received, entry in signal_msgs:
+        candidates = by_entry.get(entry, [])
+        fresh = [c for c in candidates if c not in first_msg]
+        if fresh:
+            first_msg[fresh[0]] = received
+        elif candidates:
+            duplicates += 1
+        else:
+            unmatched += 1
+    return first_msg, duplicates, unmatched
+
+# Allocations made directly by the harness (its bookkeeping, the stand-ins'
+# records) are excluded so the figure tracks the bot, not the load driver.
+def bot_memory():
+    snap = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+    return sum(t.size for t in snap.traces)
+
+def run(args):
+    candles = json.load(open(args.data)) if args.data else synthetic_cascade()
+    candles.sort(key=lambda c: c["open_time"])
+    if len(candles) <= HISTORY_CANDLES:
+        raise SystemExit(f"Need more than {HISTORY_CANDLES} candles to replay.")
+
+    # Start the clock just before the first replayed close, with HISTORY_CANDLES of history visible.
+    replay_start = candles[HISTORY_CANDLES]["open_time"] / 1000 - 1
+    replay_end = candles[-1]["open_time"] / 1000 + CANDLE_SECONDS + 10
+    clock = VirtualClock(replay_start, args.speed)
+    replay = Replay(candles, clock)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(replay))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    workdir = tempfile.mkdtemp(prefix="liquidbot-load-")
+    os.environ.update(
+        TELEGRAM_BOT_TOKEN=TOKEN,
+        WEBHOOK_URL="http://127.0.0.1",
+        OWNER_CHAT_ID=str(OWNER_CHAT_ID),
+        COINGLASS_API_KEY="loadtest",
+        NEWS_API_KEY="",
+        MEXC_BASE=f"{base}/api/v1/contract",
+        COINGLASS_BASE=base,
+        TELEGRAM_API_BASE=f"{base}/bot",
+    )
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    import utils
+    import scheduler
+    import tracing
+    import bot
+
+    utils.DB_FILE = os.path.join(workdir, "trade_logs.db")
+    utils.time = clock
+    scheduler.time = clock
+    scheduler.TICK_LOCK_TIMEOUT = 60 / args.speed
+    errors = ErrorCounter()
+    logging.getLogger().addHandler(errors)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    tracemalloc.start()
+    mem_start = bot_memory()
+    mem_samples = []
+
+    threading.Thread(target=scheduler.run_scheduler, args=(bot.scheduled_tasks,), daemon=True).start()
+
+    client_local = threading.local()
+    command_latency = []
+
+    def post_command(text):
+        client = getattr(client_local, "client", None)
+        if client is None:
+            client = client_local.client = bot.app.test_client()
+        t0 = time.perf_counter()
+        client.post(f"/{TOKEN}", json=command_update(text))
+        command_latency.append((time.perf_counter() - t0) * 1000)
+
+    rng = random.Random(args.seed)
+    cascade_liq = sorted(c["liquidation_usd"] for c in candles)[int(len(candles) * 0.9)]
+    pool = ThreadPoolExecutor(max_workers=args.workers)
+    sent_commands = 0
+    while clock.time() < replay_end:
+        visible = replay.visible()
+        in_cascade = visible and visible[-1]["liquidation_usd"] >= cascade_liq
+        rate = args.command_rate * (args.burst if in_cascade else 1)
+        time.sleep(rng.expovariate(rate))
+        pool.submit(post_command, rng.choice(COMMANDS))
+        sent_commands += 1
+        if sent_commands % 100 == 0:
+            mem_samples.append(bot_memory())
+    pool.shutdown(wait=True)
+    mem_end = bot_memory()
+    mem_peak_all = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # --- Results ---
+    # Holding scan_lock keeps a late scheduled tick from writing mid-read.
+    with scheduler.scan_lock:
+        stats = scheduler.scheduler_stats()
+        conn = utils._get_conn()
+        rows = conn.execute("SELECT entry_price, candle_open_time FROM trades ORDER BY id").fetchall()
+        conn.close()
+        with replay.lock:
+            signal_msgs = list(replay.signal_msgs)
+            locked_replies = replay.locked_replies
+    server.shutdown()
+    stored = [r[1] for r in rows]
+
+    first_tick = replay_start + 1
+    expected = expected_signals(candles, first_tick, replay_end, utils.signal_from_candles)
+    first_msg, duplicate_msgs, unmatched_msgs = match_signal_messages(rows, signal_msgs)
+    latencies = []
+    for candle_open, received in first_msg.items():
+        received_virtual = clock.start + (received - clock.real_start) * args.speed
+        latencies.append(received_virtual - (candle_open / 1000 + CANDLE_SECONDS))
+
+    # Uses the production-sized trace ring buffer, so timings cover the most recent traces only.
+    traces = tracing.recent_traces(tracing.TRACE_BUFFER_SIZE)
+    sqlite_ms = collect_spans(traces, "sqlite.")
+    report = {
+        "speed": args.speed,
+        "candles_replayed": sum(1 for c in candles if first_tick <= c["open_time"] / 1000 + CANDLE_SECONDS <= replay_end),
+        "commands_sent": sent_commands,
+        "command_latency_ms": {"p50": percentile(command_latency, 50), "p95": percentile(command_latency, 95), "max": percentile(command_latency, 100)},
+        "scheduler": {k: stats[k] for k in ("runs", "missed", "skipped", "manual_timeouts", "max_lag", "last_duration")},
+        "signals": {
+            "expected": len(expected),
+            "stored": len(set(stored)),
+            "dropped": len(expected - set(stored)),
+            "unexpected": len(set(stored) - expected),
+            "duplicate_rows": len(stored) - len(set(stored)),
+            "stored_without_message": len(set(stored) - set(first_msg)),
+            "duplicate_messages": duplicate_msgs,
+            "unmatched_messages": unmatched_msgs,
+        },
+        "signal_latency_virtual_s": {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "max": percentile(latencies, 100)},
+        "db": {
+            "locked_errors": errors.locked + locked_replies,
+            "sqlite_span_ms": {"traces": len(traces), "count": len(sqlite_ms), "p95": percentile(sqlite_ms, 95), "max": percentile(sqlite_ms, 100)},
+        },
+        "errors_logged": errors.errors,
+        "upstream_requests": dict(replay.requests),
+        "telegram_methods": dict(replay.telegram_methods),
+        # tracemalloc starts at zero, so growth is measured from the first sample
+        # (after warm-up) rather than from mem_start.
+        "memory_kb": {
+            "bot_start": mem_start // 1024,
+            "bot_first_sample": (mem_samples[0] if mem_samples else mem_start) // 1024,
+            "bot_end": mem_end // 1024,
+            "bot_growth": (mem_end - (mem_samples[0] if mem_samples else mem_start)) // 1024,
+            "bot_samples": [m // 1024 for m in mem_samples],
+            "peak_incl_harness": mem_peak_all // 1024,
+        },
+    }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a liquidation cascade through LiquidBot at accelerated speed.")
+    parser.add_argument("--speed", type=float, default=100, help="virtual seconds per real second (10-1000)")
+    parser.add_argument("--data", help="JSON file of recorded candles with liquidation_usd")
+    parser.add_argument("--command-rate", type=float, default=5, help="Telegram commands per real second")
+    parser.add_argument("--burst", type=float, default=5, help="command rate multiplier during the cascade")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent webhook clients")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import requests
 from datetime import datetime
 from config import *
 from db import log_event
+from snapshot import save_snapshot, load_snapshot
 from bot import send_alert
 
 def get_btc_price():
@@ -27,8 +28,56 @@ def detect_entry(prev_price, curr_price, liquidation_usd):
         return True, drop_pct
     return False, drop_pct
 
+def save_monitor_state(prev_price, entry=None):
+    save_snapshot(MONITOR_STATE_FILE, {"prev_price": prev_price, "entry": entry})
+
+def watch_rebound(entry):
+    entry_price = entry["entry_price"]
+    while time.time() - entry["start_time"] < TIME_WINDOW_SECONDS:
+        time.sleep(30)
+        new_price = get_btc_price()
+        rebound = (new_price - entry_price) / entry_price * 100
+
+        if rebound >= REBOUND_PCT:
+            send_alert(f"✅ *Rebound Successful!*\nEntry: ${entry_price:.2f}\nExit: ${new_price:.2f}\nRebound: {rebound:.2f}% ✅")
+            log_event({
+                "timestamp": datetime.utcnow().isoformat(),
+                "price": entry_price,
+                "liquidation_usd": entry["liquidation_usd"],
+                "price_drop_pct": entry["drop_pct"],
+                "rebound_pct": rebound,
+                "entry_price": entry_price,
+                "exit_price": new_price,
+                "result": "win"
+            })
+            return
+
+    final_price = get_btc_price()
+    rebound = (final_price - entry_price) / entry_price * 100
+    send_alert(f"❌ *Rebound Failed*\nEntry: ${entry_price:.2f}\nExit: ${final_price:.2f}\nRebound: {rebound:.2f}% ❌")
+    log_event({
+        "timestamp": datetime.utcnow().isoformat(),
+        "price": entry_price,
+        "liquidation_usd": entry["liquidation_usd"],
+        "price_drop_pct": entry["drop_pct"],
+        "rebound_pct": rebound,
+        "entry_price": entry_price,
+        "exit_price": final_price,
+        "result": "loss"
+    })
+
 def monitor_and_trade():
-    prev_price = get_btc_price()
+    # Resume from the last snapshot if it is fresh: an in-flight rebound window
+    # is finished first, and prev_price carries over instead of being re-sampled.
+    state = load_snapshot(MONITOR_STATE_FILE, SNAPSHOT_MAX_AGE) or {}
+    prev_price = state.get("prev_price")
+    if state.get("entry"):
+        watch_rebound(state["entry"])
+        prev_price = None
+    if prev_price is None:
+        prev_price = get_btc_price()
+    save_monitor_state(prev_price)
+
     while True:
         time.sleep(60)
         curr_price = get_btc_price()
@@ -36,42 +85,15 @@ def monitor_and_trade():
         is_entry, drop_pct = detect_entry(prev_price, curr_price, liq)
 
         if is_entry:
-            entry_price = curr_price
-            send_alert(f"📥 *Entry Detected!*
-Price: ${entry_price:.2f}\nDrop: {drop_pct:.2f}%\nLiquidation: ${liq/1e6:.1f}M\nMonitoring rebound...")
-            start_time = time.time()
-
-            while time.time() - start_time < TIME_WINDOW_SECONDS:
-                time.sleep(30)
-                new_price = get_btc_price()
-                rebound = (new_price - entry_price) / entry_price * 100
-
-                if rebound >= REBOUND_PCT:
-                    send_alert(f"✅ *Rebound Successful!*\nEntry: ${entry_price:.2f}\nExit: ${new_price:.2f}\nRebound: {rebound:.2f}% ✅")
-                    log_event({
-                        "timestamp": datetime.utcnow().isoformat(),
-                        "price": curr_price,
-                        "liquidation_usd": liq,
-                        "price_drop_pct": drop_pct,
-                        "rebound_pct": rebound,
-                        "entry_price": entry_price,
-                        "exit_price": new_price,
-                        "result": "win"
-                    })
-                    break
-            else:
-                final_price = get_btc_price()
-                rebound = (final_price - entry_price) / entry_price * 100
-                send_alert(f"❌ *Rebound Failed*\nEntry: ${entry_price:.2f}\nExit: ${final_price:.2f}\nRebound: {rebound:.2f}% ❌")
-                log_event({
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "price": curr_price,
-                    "liquidation_usd": liq,
-                    "price_drop_pct": drop_pct,
-                    "rebound_pct": rebound,
-                    "entry_price": entry_price,
-                    "exit_price": final_price,
-                    "result": "loss"
-                })
+            entry = {
+                "entry_price": curr_price,
+                "liquidation_usd": liq,
+                "drop_pct": drop_pct,
+                "start_time": time.time(),
+            }
+            send_alert(f"📥 *Entry Detected!*\nPrice: ${curr_price:.2f}\nDrop: {drop_pct:.2f}%\nLiquidation: ${liq/1e6:.1f}M\nMonitoring rebound...")
+            save_monitor_state(prev_price, entry)
+            watch_rebound(entry)
 
         prev_price = curr_price
+        save_monitor_state(prev_price)
@@ -0,0 +1,101 @@
+import os
+import time
+import logging
+import threading
+
+# --- Candle-aligned scheduler ---
+# Ticks fire a few seconds after each candle close (interval boundary + settle)
+# computed from the wall clock, so run time never accumulates as drift. Every
+# scan, scheduled or manual, runs under scan_lock; a tick that cannot get the
+# lock within its wait budget is skipped rather than stacked.
+CANDLE_SECONDS = 300
+SETTLE_SECONDS = float(os.getenv("SCHEDULE_SETTLE_SECONDS", "3"))
+TICK_LOCK_TIMEOUT = 60
+
+scan_lock = threading.Lock()
+
+_sched = {
+    "interval": CANDLE_SECONDS,
+    "settle": SETTLE_SECONDS,
+    "last_tick": None,
+    "runs": 0,
+    "missed": 0,
+    "skipped": 0,
+    "manual_timeouts": 0,
+    "last_lag": None,
+    "max_lag": 0.0,
+    "last_duration": None,
+}
+
+def next_boundary(now, interval=CANDLE_SECONDS, settle=SETTLE_SECONDS):
+    return ((now - settle) // interval + 1) * interval + settle
+
+def run_exclusive(job, timeout):
+    if not scan_lock.acquire(timeout=timeout):
+        return False
+    try:
+        job()
+    finally:
+        scan_lock.release()
+    return True
+
+# Manual /scan entry point; give-ups are counted apart from skipped ticks.
+def run_manual_scan(job, timeout):
+    if run_exclusive(job, timeout):
+        return True
+    _sched["manual_timeouts"] += 1
+    return False
+
+def restore_last_tick(last_tick):
+    _sched["last_tick"] = last_tick
+
+def scheduler_stats():
+    return dict(_sched)
+
+def _count_missed(target):
+    last = _sched["last_tick"]
+    if last is None:
+        return 0
+    return max(int(round((target - last) / _sched["interval"])) - 1, 0)
+
+def _tick(job, target, on_tick):
+    def timed_job():
+        # Lag is measured when the job actually starts, including any lock wait.
+        lag = round(time.time() - target, 3)
+        _sched["last_lag"] = lag
+        _sched["max_lag"] = max(_sched["max_lag"], lag)
+        t0 = time.time()
+        job()
+        _sched["last_duration"] = round(time.time() - t0, 3)
+    if run_exclusive(timed_job, TICK_LOCK_TIMEOUT):
+        _sched["runs"] += 1
+    else:
+        _sched["skipped"] += 1
+        logging.warning("Scheduled tick %s skipped: previous scan still holds the lock.", target)
+    _sched["last_tick"] = target
+    if on_tick:
+        try:
+            on_tick()
+        except Exception as e:
+            logging.error("Scheduler on_tick hook failed: %s", e)
+
+def run_scheduler(job, on_tick=None):
+    interval, settle = _sched["interval"], _sched["settle"]
+    # Warm start: if at least one boundary passed while we were down, catch up
+    # once right away instead of waiting for the next close.
+    last = _sched["last_tick"]
+    if last is not None and next_boundary(last, interval, settle) <= time.time():
+        target = next_boundary(time.time(), interval, settle) - interval
+        missed = _count_missed(target)
+        if missed:
+            _sched["missed"] += missed
+            logging.warning("Scheduler missed %d tick(s) while down; catching up.", missed)
+        _tick(job, target, on_tick)
+    while True:
+        target = next_boundary(time.time(), interval, settle)
+        missed = _count_missed(target)
+        if missed:
+            _sched["missed"] += missed
+            logging.warning("Scheduler missed %d tick(s); last run took %ss.", missed, _sched["last_duration"])
+        time.sleep(max(target - time.time(), 0))
+        _tick(job, target, on_tick)
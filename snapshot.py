@@ -0,0 +1,45 @@
+import os
+import json
+import time
+import logging
+import tempfile
+
+# --- Runtime state snapshots ---
+# Written atomically (temp file + os.replace) so a restart mid-write never sees
+# a torn file. Write failures are logged, never raised, so a full or read-only
+# disk can't kill the loops that call this; load_snapshot ignores anything
+# older than max_age seconds.
+def save_snapshot(path, state):
+    payload = dict(state, saved_at=time.time())
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.warning("Failed to write snapshot %s: %s", path, e)
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+def load_snapshot(path, max_age):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+    except Exception as e:
+        logging.warning("Ignoring unreadable snapshot %s: %s", path, e)
+        return None
+    age = time.time() - state.get("saved_at", 0)
+    if age > max_age:
+        logging.info("Snapshot %s is %.0fs old; starting cold.", path, age)
+        return None
+    logging.info("Warm start from snapshot %s (%.0fs old).", path, age)
+    return state
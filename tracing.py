@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+import threading
+import cProfile
+import pstats
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# --- Tracing spans ---
+# Spans nest per thread; when the outermost span of a thread closes, the whole
+# tree is pushed onto a ring buffer that /traces reads from.
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+
+_recent_traces = deque(maxlen=TRACE_BUFFER_SIZE)
+_local = threading.local()
+
+@contextmanager
+def span(name):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    s = {"name": name, "start": time.time(), "ms": None, "error": None, "children": []}
+    if stack:
+        stack[-1]["children"].append(s)
+    stack.append(s)
+    t0 = time.perf_counter()
+    try:
+        yield s
+    except Exception as e:
+        s["error"] = repr(e)
+        raise
+    finally:
+        s["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        stack.pop()
+        if not stack:
+            _recent_traces.append(s)
+
+def traced(name=None):
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__name__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def recent_traces(limit=10):
+    return list(_recent_traces)[-limit:]
+
+def format_trace(s, depth=0):
+    line = f"{'  ' * depth}{s['name']} {s['ms']}ms"
+    if s["error"]:
+        line += f" ! {s['error']}"
+    lines = [line]
+    for child in s["children"]:
+        lines.extend(format_trace(child, depth + 1))
+    return lines
+
+# --- On-demand profiling ---
+# arm_profile(n, callback) profiles the next n calls of @profiled functions and
+# hands the merged hot-spot report to callback. Only one call is profiled at a
+# time because the interpreter allows a single active profiler.
+_profile = {"remaining": 0, "runs": 0, "stats": None, "busy": False, "on_done": None, "top": 15}
+_profile_lock = threading.Lock()
+
+def arm_profile(runs, on_done, top=15):
+    with _profile_lock:
+        _profile.update(remaining=runs, runs=0, stats=None, on_done=on_done, top=top)
+
+@contextmanager
+def maybe_profile():
+    with _profile_lock:
+        active = _profile["remaining"] > 0 and not _profile["busy"]
+        if active:
+            _profile["busy"] = True
+    if not active:
+        yield
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        with _profile_lock:
+            if _profile["stats"] is None:
+                _profile["stats"] = pstats.Stats(prof)
+            else:
+                _profile["stats"].add(prof)
+            _profile["runs"] += 1
+            _profile["remaining"] -= 1
+            _profile["busy"] = False
+            done = _profile["remaining"] <= 0
+            report = format_profile(_profile["stats"], _profile["runs"], _profile["top"]) if done else None
+            on_done = _profile["on_done"] if done else None
+        if on_done:
+            try:
+                on_done(report)
+            except Exception as e:
+                logging.error("Profile report callback failed: %s", e)
+
+def profiled(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with maybe_profile():
+            return fn(*args, **kwargs)
+    return wrapper
+
+def format_profile(stats, runs, top=15):
+    rows = []
+    for (filename, lineno, func), (cc, nc, tt, ct, callers) in stats.stats.items():
+        rows.append((ct, tt, nc, f"{func} ({os.path.basename(filename)}:{lineno})"))
+    rows.sort(reverse=True)
+    lines = [f"🔥 Profile of {runs} run(s), top {top} by cumulative time:", "cum_ms | self_ms | calls | function"]
+    for ct, tt, nc, where in rows[:top]:
+        lines.append(f"{ct * 1000:.1f} | {tt * 1000:.1f} | {nc} | {where}")
+    return "\n".join(lines)
@@ -1,10 +1,16 @@
 import os
+import io
+import csv
 import json
+import gzip
+import tempfile
 import requests
 import sqlite3
 import logging
 import time
+import threading
 from datetime import datetime, timedelta
+from tracing import span, traced
 
 # --- Config / filenames ---
 DB_FILE = "trade_logs.db"
@@ -13,10 +19,15 @@ STRATEGY_FILE = "strategy.json"
 # --- Environment keys ---
 COINGLASS_API_KEY = os.getenv("COINGLASS_API_KEY", "").strip()
 NEWS_API_KEY = os.getenv("NEWS_API_KEY", "").strip()
+COINGLASS_BASE = os.getenv("COINGLASS_BASE", "https://open-api.coinglass.com")
+NEWS_POLL_SECONDS = int(os.getenv("NEWS_POLL_SECONDS", "600"))
 
 # --- Database helper ---
-def _get_conn():
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+# Schema setup and migrations run once per process per DB file, not on every connection.
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+def _ensure_schema(conn):
     c = conn.cursor()
     c.execute(
         """CREATE TABLE IF NOT EXISTS trades (
@@ -33,30 +44,60 @@ def _get_conn():
             score REAL,
             tp_pct REAL,
             sl_pct REAL,
-            liquidation_source TEXT
+            liquidation_source TEXT,
+            symbol TEXT,
+            candle_open_time INTEGER
         )"""
     )
+    # Older databases predate the dedupe columns; add them in place.
+    columns = {row[1] for row in c.execute("PRAGMA table_info(trades)")}
+    for name, kind in (("symbol", "TEXT"), ("candle_open_time", "INTEGER")):
+        if name not in columns:
+            c.execute(f"ALTER TABLE trades ADD COLUMN {name} {kind}")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_trades_candle ON trades (symbol, candle_open_time)")
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS news (
+            id INTEGER PRIMARY KEY,
+            published_at TEXT,
+            title TEXT,
+            url TEXT,
+            fetched_at TEXT
+        )"""
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_news_published_at ON news (published_at)")
     conn.commit()
+
+@traced("sqlite.connect")
+def _get_conn():
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+    if DB_FILE not in _schema_ready:
+        with _schema_lock:
+            if DB_FILE not in _schema_ready:
+                _ensure_schema(conn)
+                _schema_ready.add(DB_FILE)
     return conn
 
 # --- MEXC integration ---
-MEXC_BASE = "https://contract.mexc.com/api/v1/contract"
+MEXC_BASE = os.getenv("MEXC_BASE", "https://contract.mexc.com/api/v1/contract")
 SYMBOL = "BTC_USDT"  # underscore as required by MEXC
 
-def fetch_mexc_ohlcv(symbol=SYMBOL, interval="Min5", limit=50):
-    interval_map = {
-        "Min1": 60,
-        "Min5": 300,
-        "Min15": 900,
-        "Min30": 1800,
-        "Min60": 3600,
-        "Hour4": 4 * 3600,
-        "Hour8": 8 * 3600,
-        "Day1": 24 * 3600,
-    }
-    step = interval_map.get(interval, 300)
+INTERVAL_SECONDS = {
+    "Min1": 60,
+    "Min5": 300,
+    "Min15": 900,
+    "Min30": 1800,
+    "Min60": 3600,
+    "Hour4": 4 * 3600,
+    "Hour8": 8 * 3600,
+    "Day1": 24 * 3600,
+}
+
+@traced()
+def fetch_mexc_ohlcv(symbol=SYMBOL, interval="Min5", limit=50, start=None):
+    step = INTERVAL_SECONDS.get(interval, 300)
     end = int(time.time())
-    start = end - step * limit
+    if start is None:
+        start = end - step * limit
     params = {"interval": interval, "start": start, "end": end}
     try:
         url = f"{MEXC_BASE}/kline/{symbol}"
@@ -88,6 +129,35 @@ def fetch_mexc_ohlcv(symbol=SYMBOL, interval="Min5", limit=50):
         logging.warning("Failed to fetch MEXC OHLCV: %s", e)
         return []
 
+# Recent candles per (symbol, interval). Once warm, only the gap since the last
+# cached candle is fetched; that candle is re-fetched because it may still be forming.
+_candle_cache = {}
+
+@traced()
+def get_recent_candles(symbol=SYMBOL, interval="Min5", limit=50):
+    key = f"{symbol}:{interval}"
+    cached = _candle_cache.get(key, [])
+    step = INTERVAL_SECONDS.get(interval, 300)
+    if len(cached) >= limit and time.time() - cached[-1]["open_time"] / 1000 < step * limit:
+        fresh = fetch_mexc_ohlcv(symbol, interval, limit, start=cached[-1]["open_time"] // 1000)
+    else:
+        fresh = fetch_mexc_ohlcv(symbol, interval, limit)
+    if not fresh:
+        return []
+    merged = {c["open_time"]: c for c in cached}
+    merged.update((c["open_time"], c) for c in fresh)
+    candles = [merged[t] for t in sorted(merged)][-limit:]
+    _candle_cache[key] = candles
+    return candles
+
+def candle_cache_state():
+    return {key: list(candles) for key, candles in _candle_cache.items()}
+
+def restore_candle_cache(state):
+    _candle_cache.clear()
+    _candle_cache.update(state or {})
+
+@traced()
 def fetch_mexc_ticker(symbol=SYMBOL):
     try:
         url = f"{MEXC_BASE}/ticker"
@@ -102,6 +172,7 @@ def fetch_mexc_ticker(symbol=SYMBOL):
         logging.warning("Failed to fetch MEXC ticker: %s", e)
         return {}
 
+@traced()
 def fetch_mexc_funding_rate(symbol=SYMBOL):
     try:
         url = f"{MEXC_BASE}/funding_rate/{symbol}"
@@ -129,13 +200,14 @@ def infer_liquidation_pressure_from_mexc():
     return fallback_liq, "mexc_inferred"
 
 # --- CoinGlass liquidation ---
+@traced()
 def fetch_coinglass_liquidation():
     if not COINGLASS_API_KEY:
         logging.warning("CoinGlass API key missing.")
         return 0
     try:
         headers = {"accept": "application/json", "coinglassSecret": COINGLASS_API_KEY}
-        url = "https://open-api.coinglass.com/public/v2/liquidation/chart?symbol=BTC"
+        url = f"{COINGLASS_BASE}/public/v2/liquidation/chart?symbol=BTC"
         resp = requests.get(url, headers=headers, timeout=10)
         if resp.status_code != 200:
             logging.warning("CoinGlass HTTP %s: %s", resp.status_code, resp.text[:200])
@@ -150,6 +222,7 @@ def fetch_coinglass_liquidation():
         logging.warning("CoinGlass fetch failed: %s", e)
         return 0
 
+@traced()
 def fetch_combined_liquidation():
     cg = fetch_coinglass_liquidation()
     if cg and cg > 0:
@@ -160,6 +233,7 @@ def fetch_combined_liquidation():
     return 0, "none"
 
 # --- Price fallback via CoinGecko if MEXC fails ---
+@traced()
 def fetch_coingecko_price_candle():
     try:
         resp = requests.get(
@@ -172,12 +246,19 @@ def fetch_coingecko_price_candle():
         data = resp.json()
         price = float(data.get("bitcoin", {}).get("usd", 0))
         if price > 0:
-            t_ms = int(time.time() * 1000)
+            t_ms = int(time.time() // 300 * 300 * 1000)
             return [{"open_time": t_ms, "open": price, "high": price, "low": price, "close": price}]
     except Exception as e:
         logging.warning("CoinGecko fallback failed: %s", e)
     return []
 
+# The newest kline is still forming; signals are judged on the last closed candle.
+def closed_candles(ohlcv, interval="Min5"):
+    step = INTERVAL_SECONDS.get(interval, 300)
+    if len(ohlcv) > 1 and ohlcv[-1]["open_time"] / 1000 + step > time.time():
+        return ohlcv[:-1]
+    return ohlcv
+
 # --- RSI ---
 def compute_rsi(closes, period=14):
     if len(closes) < period + 1:
@@ -226,12 +307,19 @@ def check_tp_sl(entry_price, current_price, direction, tp_pct=0.015, sl_pct=0.01
             return "SL HIT"
     return "open"
 
+@traced()
 def generate_trade_signal():
-    ohlcv = fetch_mexc_ohlcv()
+    ohlcv = closed_candles(get_recent_candles())
     if not ohlcv:
         ohlcv = fetch_coingecko_price_candle()
     if not ohlcv:
         return None
+    liquidation, source = fetch_combined_liquidation()
+    return signal_from_candles(ohlcv, liquidation, source, news_count=get_news_count(60))
+
+# Pure signal rule over already-fetched inputs (also used by loadtest.py to
+# work out which candles should have produced a signal).
+def signal_from_candles(ohlcv, liquidation, source, news_count=0):
     closes = [c["close"] for c in ohlcv]
     rsi = compute_rsi(closes[-15:]) if len(closes) >= 15 else None
     last = ohlcv[-1]
@@ -245,7 +333,6 @@ def generate_trade_signal():
     upper_wick = high - max(open_p, close_p)
     upper_wick_pct = (upper_wick / total_range) * 100
 
-    liquidation, source = fetch_combined_liquidation()
     funding_rate = 1.0  # could be replaced with real funding from MEXC if desired
 
     direction = None
@@ -276,17 +363,23 @@ def generate_trade_signal():
         "tp_pct": 0.015,
         "sl_pct": 0.01,
         "liquidation_source": source,
+        "news_count_1h": news_count,
+        "symbol": SYMBOL,
+        "candle_open_time": last["open_time"],
     }
     return signal
 
 # --- Persistence & evaluation ---
+# Returns False when a signal for the same (symbol, candle_open_time) is already stored.
+@traced("sqlite.store_trade")
 def store_trade(trade):
     conn = _get_conn()
     c = conn.cursor()
     c.execute(
-        """INSERT INTO trades 
-           (time, direction, entry_price, result, rsi, wick_percent, liquidation_usd, score, tp_pct, sl_pct, liquidation_source)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        """INSERT OR IGNORE INTO trades
+           (time, direction, entry_price, result, rsi, wick_percent, liquidation_usd, score, tp_pct, sl_pct,
+            liquidation_source, symbol, candle_open_time)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
         (
             trade.get("time"),
             trade.get("direction"),
@@ -299,16 +392,22 @@ def store_trade(trade):
             trade.get("tp_pct"),
             trade.get("sl_pct"),
             trade.get("liquidation_source"),
+            trade.get("symbol"),
+            trade.get("candle_open_time"),
         ),
     )
+    inserted = c.rowcount == 1
     conn.commit()
     conn.close()
+    return inserted
 
+@traced()
 def evaluate_open_trades():
     conn = _get_conn()
     c = conn.cursor()
-    c.execute("SELECT * FROM trades WHERE result = 'open'")
-    rows = c.fetchall()
+    with span("sqlite.select_open_trades"):
+        c.execute("SELECT * FROM trades WHERE result = 'open'")
+        rows = c.fetchall()
     if not rows:
         conn.close()
         return
@@ -334,30 +433,145 @@ def evaluate_open_trades():
             )
             updated = True
     if updated:
-        conn.commit()
+        with span("sqlite.commit"):
+            conn.commit()
     conn.close()
 
 # --- Reporting ---
+TRADE_COLUMNS = (
+    "id",
+    "time",
+    "direction",
+    "entry_price",
+    "result",
+    "exit_price",
+    "exit_time",
+    "rsi",
+    "wick_percent",
+    "liquidation_usd",
+    "score",
+    "tp_pct",
+    "sl_pct",
+    "liquidation_source",
+    "symbol",
+    "candle_open_time",
+)
+_TRADE_SELECT = "SELECT " + ", ".join(TRADE_COLUMNS) + " FROM trades"
+
 def format_trade_row(r):
-    _, time_str, direction, entry_price, result, exit_price, exit_time, rsi, wick, liq, score, tp_pct, sl_pct, source = r
-    s = f"{time_str} | {direction.upper()} @ {entry_price:.1f} | RSI={rsi} | Wick={wick:.2f}% | Liq=${liq:,} ({source}) | Score={score}"
-    if result and result != "open":
-        s += f" | {result} @ {exit_price:.1f} ({exit_time})"
+    t = dict(zip(TRADE_COLUMNS, r))
+    s = (
+        f"{t['time']} | {t['direction'].upper()} @ {t['entry_price']:.1f} | RSI={t['rsi']} | "
+        f"Wick={t['wick_percent']:.2f}% | Liq=${t['liquidation_usd']:,} ({t['liquidation_source']}) | Score={t['score']}"
+    )
+    if t["result"] and t["result"] != "open":
+        s += f" | {t['result']} @ {t['exit_price']:.1f} ({t['exit_time']})"
     return s
 
-def get_last_trades(limit=30):
+# Keyset pagination, newest first: before_id walks to older trades, after_id to
+# newer ones. Returns (rows, older_cursor, newer_cursor); None = nothing further.
+@traced("sqlite.fetch_trades_page")
+def fetch_trades_page(limit=30, before_id=None, after_id=None):
     conn = _get_conn()
     c = conn.cursor()
-    c.execute("SELECT * FROM trades ORDER BY id DESC LIMIT ?", (limit,))
-    rows = c.fetchall()
+    if after_id is not None:
+        c.execute(_TRADE_SELECT + " WHERE id > ? ORDER BY id ASC LIMIT ?", (after_id, limit))
+        rows = c.fetchall()[::-1]
+    elif before_id is not None:
+        c.execute(_TRADE_SELECT + " WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit))
+        rows = c.fetchall()
+    else:
+        c.execute(_TRADE_SELECT + " ORDER BY id DESC LIMIT ?", (limit,))
+        rows = c.fetchall()
+    older = newer = None
+    if rows:
+        c.execute("SELECT 1 FROM trades WHERE id < ? LIMIT 1", (rows[-1][0],))
+        if c.fetchone():
+            older = rows[-1][0]
+        c.execute("SELECT 1 FROM trades WHERE id > ? LIMIT 1", (rows[0][0],))
+        if c.fetchone():
+            newer = rows[0][0]
     conn.close()
+    return rows, older, newer
+
+def get_trades_page(limit=30, before_id=None, after_id=None):
+    rows, older, newer = fetch_trades_page(limit, before_id, after_id)
     if not rows:
-        return "No recent trades."
-    return "\n".join(format_trade_row(r) for r in rows)
+        return "No recent trades.", None, None
+    return "\n".join(format_trade_row(r) for r in rows), older, newer
+
+def get_last_trades(limit=30):
+    return get_trades_page(limit)[0]
 
 def get_logs(limit=20):
     return get_last_trades(limit)
 
+# --- Export ---
+# Every trade in id order, holding only one keyset batch in memory at a time.
+def iter_trade_rows(batch_size=500):
+    last_id = 0
+    while True:
+        conn = _get_conn()
+        c = conn.cursor()
+        c.execute(_TRADE_SELECT + " WHERE id > ? ORDER BY id ASC LIMIT ?", (last_id, batch_size))
+        rows = c.fetchall()
+        conn.close()
+        if not rows:
+            return
+        for r in rows:
+            yield r
+        last_id = rows[-1][0]
+
+def iter_trades_csv(batch_size=500):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(TRADE_COLUMNS)
+    for r in iter_trade_rows(batch_size):
+        writer.writerow(r)
+        if buf.tell() >= 64 * 1024:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+def iter_trades_json(batch_size=500):
+    yield "["
+    sep = "\n"
+    for r in iter_trade_rows(batch_size):
+        yield sep + json.dumps(dict(zip(TRADE_COLUMNS, r)))
+        sep = ",\n"
+    yield "\n]\n"
+
+EXPORT_FORMATS = {"csv": iter_trades_csv, "json": iter_trades_json}
+
+EXPORT_PART_BYTES = 8 * 1024 * 1024  # uncompressed bytes per uploaded part
+
+# Gzipped export parts as (file, uncompressed_bytes). Each part is a complete gzip
+# member, so `cat part* | gunzip` rebuilds the export; the uploader only ever
+# holds one compressed part (well under Telegram's 50 MB bot limit) in memory.
+def iter_export_parts(fmt="csv", part_bytes=EXPORT_PART_BYTES):
+    fh = gz = None
+    size = 0
+    for chunk in EXPORT_FORMATS[fmt]():
+        if gz is None:
+            fh = tempfile.TemporaryFile()
+            gz = gzip.GzipFile(fileobj=fh, mode="wb")
+            size = 0
+        data = chunk.encode("utf-8")
+        gz.write(data)
+        size += len(data)
+        if size >= part_bytes:
+            gz.close()
+            fh.seek(0)
+            yield fh, size
+            fh.close()
+            fh = gz = None
+    if gz is not None:
+        gz.close()
+        fh.seek(0)
+        yield fh, size
+        fh.close()
+
 def get_status():
     default = {"rsi_threshold": 35, "wick_threshold": 0.5, "liq_threshold": 2_000_000}
     if os.path.exists(STRATEGY_FILE):
@@ -371,25 +585,20 @@ def get_status():
         f"Wick>{default.get('wick_threshold')}%, Liq>${default.get('liq_threshold'):,}"
     )
 
-def run_backtest(days=7):
-    cutoff = datetime.utcnow() - timedelta(days=days)
+@traced()
+def run_backtest(days=7, limit=30):
+    cutoff = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
     conn = _get_conn()
     c = conn.cursor()
-    c.execute("SELECT * FROM trades ORDER BY id DESC")
+    # `time` is stored as "%Y-%m-%d %H:%M:%S", so string comparison is chronological.
+    c.execute(_TRADE_SELECT + " WHERE time >= ? ORDER BY id DESC LIMIT ?", (cutoff, limit))
     rows = c.fetchall()
     conn.close()
-    filtered = []
-    for r in rows:
-        try:
-            t = datetime.strptime(r[1], "%Y-%m-%d %H:%M:%S")
-        except:
-            continue
-        if t >= cutoff:
-            filtered.append(format_trade_row(r))
-    if not filtered:
+    if not rows:
         return f"No trades in last {days} days."
-    return "📉 Backtest:\n" + "\n".join(filtered[:30])
+    return "📉 Backtest:\n" + "\n".join(format_trade_row(r) for r in rows)
 
+@traced()
 def get_results_summary():
     conn = _get_conn()
     c = conn.cursor()
@@ -416,24 +625,138 @@ def get_results_summary():
         f"Avg score: {avg_score}"
     )
 
-# --- News fetch ---
-def fetch_news():
-    if not NEWS_API_KEY:
-        return ["No news API key set."]
+# --- News cache ---
+# A background poller pulls CryptoPanic incrementally into the `news` table;
+# /news and the signal features read only from the local cache.
+NEWS_URL = "https://cryptopanic.com/api/v1/posts/"
+NEWS_COUNT_WINDOWS = (15, 60, 240)  # minutes
+NEWS_MAX_BACKOFF = 3600
+NEWS_COUNT_TTL = 60  # seconds before the per-window counts are recomputed locally
+
+_news_state = {"last_id": None, "next_poll": 0.0, "backoff": NEWS_POLL_SECONDS, "last_error": None, "counts_at": 0.0}
+_news_counts = {}
+_news_thread = None
+
+def _parse_news_time(value):
     try:
-        url = f"https://cryptopanic.com/api/v1/posts/?auth_token={NEWS_API_KEY}&currencies=BTC"
-        r = requests.get(url, timeout=10)
-        if r.status_code != 200:
-            return [f"CryptoPanic HTTP {r.status_code}: {r.text[:200]}"]
-        data = r.json()
-        items = data.get("results", [])[:5]
-        if not items:
-            return ["No recent news found."]
-        headlines = []
-        for it in items:
-            title = it.get("title", "No title")
-            link = it.get("url", "")
-            headlines.append(f"• {title}\n{link}")
-        return headlines
+        return datetime.strptime((value or "")[:19], "%Y-%m-%dT%H:%M:%S").strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+def _news_failed(reason):
+    _news_state["last_error"] = reason
+    _news_state["backoff"] = min(_news_state["backoff"] * 2, NEWS_MAX_BACKOFF)
+    _news_state["next_poll"] = time.time() + _news_state["backoff"]
+    logging.warning("News poll failed (%s); next attempt in %ss", reason, _news_state["backoff"])
+
+@traced("sqlite.refresh_news_counts")
+def refresh_news_counts(now=None):
+    global _news_counts
+    now = now or datetime.utcnow()
+    conn = _get_conn()
+    c = conn.cursor()
+    counts = {}
+    for window in NEWS_COUNT_WINDOWS:
+        cutoff = (now - timedelta(minutes=window)).strftime("%Y-%m-%d %H:%M:%S")
+        c.execute("SELECT COUNT(*) FROM news WHERE published_at >= ?", (cutoff,))
+        counts[window] = c.fetchone()[0]
+    conn.close()
+    # Rebind rather than mutate so concurrent readers never see a half-filled dict.
+    _news_counts = counts
+    _news_state["counts_at"] = time.time()
+    return counts
+
+# Counts are cached between polls but expire after NEWS_COUNT_TTL, so windows
+# keep sliding even while the poller is backing off or disabled.
+def get_news_count(window_minutes=60):
+    if window_minutes not in NEWS_COUNT_WINDOWS:
+        return 0
+    if time.time() - _news_state["counts_at"] >= NEWS_COUNT_TTL:
+        refresh_news_counts()
+    return _news_counts.get(window_minutes, 0)
+
+@traced()
+def poll_news():
+    if not NEWS_API_KEY or time.time() < _news_state["next_poll"]:
+        return 0
+    try:
+        r = requests.get(
+            NEWS_URL,
+            params={"auth_token": NEWS_API_KEY, "currencies": "BTC", "public": "true"},
+            timeout=10,
+        )
     except Exception as e:
-        return [f"News fetch error: {e}"]
+        _news_failed(f"request error: {e}")
+        return 0
+    if r.status_code != 200:
+        _news_failed(f"HTTP {r.status_code}: {r.text[:200]}")
+        return 0
+    # Any failure from here on (bad payload, locked DB) must still go through
+    # _news_failed so the poller backs off instead of hammering the API.
+    conn = None
+    try:
+        payload = r.json()
+        if not isinstance(payload, dict) or not isinstance(payload.get("results", []), list):
+            raise ValueError(f"unexpected payload: {str(payload)[:200]}")
+        conn = _get_conn()
+        c = conn.cursor()
+        if _news_state["last_id"] is None:
+            c.execute("SELECT MAX(id) FROM news")
+            _news_state["last_id"] = c.fetchone()[0] or 0
+        # Results are newest first; anything at or below the last seen id is already stored.
+        fetched_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        fresh = [
+            it for it in payload.get("results", [])
+            if isinstance(it, dict) and isinstance(it.get("id"), int) and it["id"] > _news_state["last_id"]
+        ]
+        c.executemany(
+            "INSERT OR IGNORE INTO news (id, published_at, title, url, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (it["id"], _parse_news_time(it.get("published_at")), it.get("title", "No title"), it.get("url", ""), fetched_at)
+                for it in fresh
+            ],
+        )
+        inserted = c.rowcount if fresh else 0
+        conn.commit()
+    except Exception as e:
+        _news_failed(f"bad response or store error: {e}")
+        return 0
+    finally:
+        if conn is not None:
+            conn.close()
+    if fresh:
+        _news_state["last_id"] = max(it["id"] for it in fresh)
+    _news_state["last_error"] = None
+    _news_state["backoff"] = NEWS_POLL_SECONDS
+    _news_state["next_poll"] = time.time() + NEWS_POLL_SECONDS
+    refresh_news_counts()
+    return inserted
+
+def start_news_poller():
+    global _news_thread
+    if _news_thread is not None or not NEWS_API_KEY:
+        return
+    def loop():
+        while True:
+            try:
+                poll_news()
+            except Exception as e:
+                logging.error("News poller crashed: %s", e)
+            time.sleep(max(_news_state["next_poll"] - time.time(), 5))
+    _news_thread = threading.Thread(target=loop, name="news-poller", daemon=True)
+    _news_thread.start()
+
+@traced()
+def fetch_news(limit=5):
+    conn = _get_conn()
+    c = conn.cursor()
+    c.execute("SELECT title, url FROM news ORDER BY published_at DESC, id DESC LIMIT ?", (limit,))
+    rows = c.fetchall()
+    conn.close()
+    if not rows:
+        if not NEWS_API_KEY:
+            return ["No news API key set."]
+        if _news_state["last_error"]:
+            return [f"News fetch error: {_news_state['last_error']}"]
+        return ["No recent news found."]
+    return [f"• {title}\n{link}" for title, link in rows]